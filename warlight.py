@@ -22,6 +22,27 @@ THE SOFTWARE.
 
 import sys
 import re
+from array import array
+from collections import defaultdict
+
+try:
+    # Prefer Google's RE2 engine when its binding is installed; linear time
+    # matching suits this line oriented protocol and the binding mirrors the
+    # re module API. The stdlib engine remains the fallback.
+    import re2 as _regex_engine
+except ImportError:
+    _regex_engine = re
+
+
+def _compile(regex, flags=0):
+    """
+    Compile through the preferred regex engine, falling back to the stdlib
+    engine for constructs the optional backend cannot translate.
+    """
+    try:
+        return _regex_engine.compile(regex, flags)
+    except Exception:
+        return re.compile(regex, flags)
 
 
 def event(regex):
@@ -29,36 +50,89 @@ def event(regex):
     Add an event regex to be matched against the protocol event message
     """
     def wrap(function):
-        function.pattern = re.compile(regex, re.IGNORECASE)
+        function.pattern = _compile(regex, re.IGNORECASE)
         return function
     return wrap
 
 
+# Events that fire every turn. They are placed first in the master
+# alternation so the regex tries the most frequent alternatives before the
+# one-off setup and settings events.
+_HOT_EVENTS = ('on_update_map', 'on_opponent_moves', 'on_go_attack_or_transfer', 'on_go_place_armies')
+
+
+class EngineMeta(type):
+    """
+    Collect all event handler methods once at class creation time. Handlers are
+    stored as a tuple of (pattern, sub_pattern, method_name) and their patterns
+    are additionally combined into one master alternation regex, so parsing a
+    message costs a single regex match instead of one search per handler.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        cls = super(EngineMeta, mcs).__new__(mcs, name, bases, namespace)
+        handlers = []
+        for attr_name in dir(cls):
+            attr = getattr(cls, attr_name, None)
+            if callable(attr) and getattr(attr, 'pattern', None) is not None:
+                handlers.append((attr.pattern, getattr(attr, 'sub_pattern', None), attr_name))
+        handlers.sort(key=lambda handler: _HOT_EVENTS.index(handler[2])
+                      if handler[2] in _HOT_EVENTS else len(_HOT_EVENTS))
+        cls._handlers = tuple(handlers)
+        cls._handler_method_names = tuple(name for _, _, name in handlers)
+
+        # Wrap each event pattern in a named group and join them into a single
+        # alternation anchored at the start of the message. The dispatch table
+        # maps the matched group name straight to the handler function, its
+        # resolved sub pattern and the index of the handler's own capture
+        # group within the master regex, so the hot path needs no getattr.
+        alternatives = []
+        dispatch = {}
+        group_index = 0
+        for pattern, sub_pattern, method_name in handlers:
+            alternatives.append('(?P<%s>%s)' % (method_name, pattern.pattern.lstrip('^')))
+            dispatch[method_name] = (getattr(cls, method_name), sub_pattern, group_index + 2)
+            group_index += 1 + pattern.groups
+        cls._master_pattern = _compile('^(?:%s)' % '|'.join(alternatives), re.IGNORECASE)
+        cls._dispatch = dispatch
+        return cls
+
+
 def event_item(regex):
     """
     Add inner regex grouping for repeating expressions within the event expression result.
     """
     def wrap(function):
-        function.sub_pattern = re.compile(regex, re.IGNORECASE)
+        function.sub_pattern = _compile(regex, re.IGNORECASE)
         return function
     return wrap
 
 
 class Region(object):
     """
-    An object representing a region. Contains a list of neighbors linking
-    to other regions which this region borders as well as the super region
-    this region belongs to.  Current owner and army count is also stored.
+    An object representing a region. Contains a flat array of neighbouring
+    region ids which this region borders as well as the super region this
+    region belongs to.  Current owner and army count is also stored.
+    The region id is an int so map lookups hash a small integer rather
+    than a string.
     """
 
+    __slots__ = ('region_id', 'super_region', 'armies', 'owner', 'neighbours', 'extras')
+
     def __init__(self, region_id, super_region):
         self.region_id = region_id
         self.super_region = super_region
         self.armies = 0
         self.owner = 'neutral'
-        self.neighbours = []
+        self.neighbours = array('I')
         self.extras = {}
 
+    def neighbour_regions(self, engine):
+        """
+        Resolve the neighbouring region ids back into Region objects.
+        """
+        return [engine.regions[region_id] for region_id in self.neighbours]
+
 
 class SuperRegion(object):
     """
@@ -66,6 +140,8 @@ class SuperRegion(object):
     of the super region. Also contains information about the army reward bonus.
     """
 
+    __slots__ = ('super_region_id', 'reward', 'regions', 'extras')
+
     def __init__(self, super_region_id, reward):
         self.super_region_id = super_region_id
         self.reward = reward
@@ -184,60 +260,61 @@ class Handler(object):
         raise NotImplementedError
 
 
-class Engine(object):
+class Engine(object, metaclass=EngineMeta):
 
     def __init__(self, handler):
         self.handler = handler
-        self.handler_methods = []
         self.responses = []
         self.super_regions = {}
         self.regions = {}
         self.me = None
         self.opponent = None
         self.starting_armies = 0
-        self.handler_methods = [method for method in dir(self)
-                                if callable(getattr(self, method)) and re.search('^(on_*.)', method, re.IGNORECASE)]
+        self.neighbours_csr = None
+        self.armies = None
+        self.owner_ids = None
+        self.owner_names = ['neutral']
+        self._owner_index = {'neutral': 0}
 
     def run(self):
-        while not sys.stdin.closed:
-            try:
-                message = sys.stdin.readline()
-
-                # Ignore message of no length
-                if len(message) == 0:
-                    continue
-
-                # Parse the message.
-                self._parse(message)
-
-            except KeyboardInterrupt:
-                return
-            except EOFError:
-                return
+        # Line buffering flushes on the newline terminating each response, so
+        # respond() does not need a flush and syscall per turn. Streams that
+        # cannot be reconfigured (e.g. a StringIO stand-in) are left alone.
+        try:
+            sys.stdout.reconfigure(line_buffering=True)
+        except AttributeError:
+            pass
+
+        try:
+            # Iterating the stream lets the buffered reader hand out lines
+            # without a Python level readline call per message.
+            for message in sys.stdin:
+                if message:
+                    self._parse(message)
+        except (KeyboardInterrupt, EOFError):
+            return
 
     def _parse(self, message):
         """
-        Find all message handlers defined in the Engine that are able of handling the message. If a sub pattern is
+        Find the message handler defined in the Engine that is able of handling the message. If a sub pattern is
         found then find all occurrences and pass into the message handler as a parameter.
 
         """
-        for method in self.handler_methods:
-            temp = getattr(self, method)
-            pattern = getattr(temp, 'pattern', False)
-            match = pattern.search(message)
+        match = self._master_pattern.match(message)
+
+        # Make sure that a handler matched the message at all.
+        if match is None:
+            return
 
-            # Make sure that there is a match for this method.
-            if match is not None:
-                group = match.group(1)
-                sub_pattern = getattr(temp, 'sub_pattern', False)
+        function, sub_pattern, group_index = self._dispatch[match.lastgroup]
+        group = match.group(group_index)
 
-                # If sub pattern matches are found then add list argument, else just
-                # pass the original matching group.
-                if sub_pattern:
-                    groups = re.findall(sub_pattern, group)
-                    temp(groups)
-                else:
-                    temp(group)
+        # If a sub pattern is present then pass an iterator of its matches,
+        # else just pass the original matching group.
+        if sub_pattern:
+            function(self, sub_pattern.finditer(group))
+        else:
+            function(self, group)
 
     def log(self, message):
         """
@@ -253,8 +330,8 @@ class Engine(object):
         if len(self.responses) == 0:
             self.do_no_moves()
 
-        sys.stdout.write(",".join(self.responses) + '\n')
-        sys.stdout.flush()
+        sys.stdout.write(",".join(self.responses))
+        sys.stdout.write('\n')
         self.responses = []
 
     def add_response(self, message):
@@ -279,61 +356,96 @@ class Engine(object):
         """
         Add a response for placing troops on a defined region.
         """
-        self.add_response("%s place_armies %s %s" % (self.me, region.region_id, troop_count))
+        self.add_response(f"{self.me} place_armies {region.region_id} {troop_count}")
 
     def do_attack_or_transfer(self, source, target, troop_count):
         """
         Add a response for attacking or transferring troops from source region to target region.
         """
-        self.add_response("%s attack/transfer %s %s %s" % (self.me, source.region_id, target.region_id, troop_count))
+        self.add_response(f"{self.me} attack/transfer {source.region_id} {target.region_id} {troop_count}")
 
-    @event("^setup_map\\s+super_regions\\s+(.*)")
-    @event_item("(\\d+\\s+\\d)")
+    @event("^setup_map\\s+super_regions\\s+(.+)")
+    @event_item("(\\d+)\\s+(\\d+)")
     def on_setup_map_super_regions(self, super_regions):
         """
         Engine returns super regions and their rewards.
         """
-        for super_region in super_regions:
-            split = super_region.split(" ")
-            new_super_region = SuperRegion(split[0], split[1])
-            self.super_regions[split[0]] = new_super_region
-            self.handler.per_setup_super_region(self, new_super_region, split[1])
+        for match in super_regions:
+            super_region_id, reward = match.group(1), match.group(2)
+            new_super_region = SuperRegion(super_region_id, reward)
+            self.super_regions[super_region_id] = new_super_region
+            self.handler.per_setup_super_region(self, new_super_region, reward)
         self.handler.on_setup_super_region(self)
 
-    @event("^setup_map\\s+regions\\s+(.*)")
-    @event_item("(\\d+\\s+\\d)")
+    @event("^setup_map\\s+regions\\s+(.+)")
+    @event_item("(\\d+)\\s+(\\d+)")
     def on_setup_map_regions(self, regions):
         """
         Engine returns regions for the map.
         """
-        for region in regions:
-            split = region.split(" ")
-            super_region = self.super_regions[split[1]]
-            new_region = Region(split[0], super_region)
-            self.regions[split[0]] = new_region
+        for match in regions:
+            region_id = int(match.group(1))
+            super_region = self.super_regions[match.group(2)]
+            new_region = Region(region_id, super_region)
+            self.regions[region_id] = new_region
             self.handler.per_setup_region(self, super_region, new_region)
+
+        # Parallel struct-of-arrays views of the map state, indexed by region
+        # id, so bot logic can scan army counts and owners contiguously.
+        size = max(self.regions) + 1 if self.regions else 0
+        self.armies = array('i', [0] * size)
+        self.owner_ids = array('b', [0] * size)
         self.handler.on_setup_region(self)
 
-    @event("^setup_map\\s+neighbors\\s+(.*)")
-    @event_item("(\\d+\\s+(?:[0-9,]*))")
+    @event("^setup_map\\s+neighbors\\s+(.+)")
+    @event_item("(\\d+)\\s+([\\d,]+)")
     def on_setup_map_neighbors(self, neighbors):
         """
         Engine returns a list of region ids with its neighbours. Update our regions to link together if they are
         neighbours.
         """
-        for block in neighbors:
-            split = block.split(" ")
-            region = self.regions[split[0]]
-            region_neighbors = split[1].split(",")
-
-            for neighbor in region_neighbors:
-                new_neighbor = self.regions[neighbor]
-                region.neighbours.append(new_neighbor)
-                new_neighbor.neighbours.append(region)
-                self.handler.per_setup_neighbor(self, region, new_neighbor)
-
+        # First pass: collect the symmetric adjacency into sets so an edge
+        # listed from both ends cannot produce duplicate neighbour entries.
+        adjacency = defaultdict(set)
+        edges = []
+        for match in neighbors:
+            region_id = int(match.group(1))
+            neighbor_ids = adjacency[region_id]
+
+            for neighbor in match.group(2).split(","):
+                neighbor_id = int(neighbor)
+                if neighbor_id not in neighbor_ids:
+                    neighbor_ids.add(neighbor_id)
+                    adjacency[neighbor_id].add(region_id)
+                    edges.append((region_id, neighbor_id))
+
+        # Second pass: assign each region's neighbour array in a single
+        # allocation, then fire the per-edge callbacks once per unique edge.
+        regions = self.regions
+        for region_id, neighbor_ids in adjacency.items():
+            regions[region_id].neighbours = array('I', sorted(neighbor_ids))
+        for region_id, neighbor_id in edges:
+            self.handler.per_setup_neighbor(self, regions[region_id], regions[neighbor_id])
+
+        self._build_neighbours_csr()
         self.handler.on_setup_neighbor(self)
 
+    def _build_neighbours_csr(self):
+        """
+        Build a flat CSR style adjacency (offsets plus one contiguous array of
+        neighbouring region ids, indexed by region id) so traversals can walk
+        contiguous memory instead of chasing per-region lists.
+        """
+        size = max(self.regions) + 1 if self.regions else 0
+        offsets = array('I', [0] * (size + 1))
+        targets = array('I')
+        for region_id in range(size):
+            region = self.regions.get(region_id)
+            if region is not None:
+                targets.extend(region.neighbours)
+            offsets[region_id + 1] = len(targets)
+        self.neighbours_csr = (offsets, targets)
+
     @event("^settings\\s+your_bot\\s+((?:[a-z][a-z0-9_]*))")
     def on_settings_your_bot(self, name):
         """
@@ -355,70 +467,74 @@ class Engine(object):
         """
         Engine returns the amount of armies that the bot can place in this round.
         """
-        self.starting_armies = int(armies)
-        self.handler.on_setting_starting_armies(self, int(armies))
+        armies = int(armies)
+        self.starting_armies = armies
+        self.handler.on_setting_starting_armies(self, armies)
 
-    @event("^update_map\\s+(.*)")
-    @event_item("(\\d+\\s+(?:[a-z][a-z0-9_]*)\\s+\\d+)")
+    @event("^update_map\\s+(.+)")
+    @event_item("(\\d+)\\s+([a-z][a-z0-9_]*)\\s+(\\d+)")
     def on_update_map(self, updates):
         """
-        Engine returns a bunch of updates.  Update each regions owner and army count.
-        """
-        for update in updates:
-            split = update.split(" ")
-            region = self.regions[split[0]]
-            region.owner = split[1]
-            region.armies = int(split[2])
-            self.handler.per_update_map(self, region, region.owner, region.armies)
+        Engine returns a bunch of updates.  Update each regions owner and army
+        count, mirrored into the engine's flat armies and owner_ids arrays.
+        """
+        # Hoist the lookups out of the loop; this runs for every region on
+        # every turn.
+        regions = self.regions
+        per_update_map = self.handler.per_update_map
+        owner_index = self._owner_index
+        armies_by_id = self.armies
+        owners_by_id = self.owner_ids
+        _int = int
+        for match in updates:
+            region_id = _int(match.group(1))
+            region = regions[region_id]
+            owner = match.group(2)
+            armies = _int(match.group(3))
+            region.owner = owner
+            region.armies = armies
+
+            index = owner_index.get(owner)
+            if index is None:
+                index = owner_index[owner] = len(self.owner_names)
+                self.owner_names.append(owner)
+            armies_by_id[region_id] = armies
+            owners_by_id[region_id] = index
+            per_update_map(self, region, owner, armies)
         self.handler.on_update_map(self)
 
-    @event("^opponent_moves\\s+(.*)")
-    @event_item("((?:[a-z][a-z0-9_]*)\\s+(?:place_armies|attack\\/transfer)\\s+\\d+\\s+\\d+)")
+    @event("^opponent_moves\\s+(.+)")
+    @event_item("(\\w+)\\s+(place_armies|attack/transfer)\\s+(\\d+)\\s+(\\d+)")
     def on_opponent_moves(self, args):
         """
         Engine returns all the opponent moves whether it is an army placement or a move/transfer.
         """
-        placements = []
-        attacks_or_transfers = []
-
-        # Filter placements and attack/transfers into their own lists.
-        for block in args:
-            temp = block.split(' ')
-            if temp[1] is 'place_armies':
-                placements.append(block)
-            elif temp[1] is 'attack/transfer':
-                attacks_or_transfers.append(block)
-
-        # Update regions with additional armies.
-        for block in placements:
-            temp = block.split(' ')
-            region = self.regions[temp[2]]
-            armies = int(temp[3])
-            #region.armies += armies
-            self.handler.per_opponent_place_armies(self, region, armies)
+        # Dispatch each move straight to its handler in a single pass.
+        regions = self.regions
+        _int = int
+        for match in args:
+            region = regions[_int(match.group(3))]
+            armies = _int(match.group(4))
+            if match.group(2) == 'place_armies':
+                self.handler.per_opponent_place_armies(self, region, armies)
+            else:
+                self.handler.per_opponent_attack_or_move(self, region, armies)
         self.handler.on_opponent_place_armies(self)
-
-        # Call handler method for attack or transfers.
-        for block in attacks_or_transfers:
-            temp = block.split(' ')
-            region = self.regions[temp[2]]
-            armies = int(temp[3])
-            self.handler.per_opponent_attack_or_move(self, region, armies)
         self.handler.on_opponent_attack_or_move(self)
 
-    @event("^pick_starting_regions\\s+(.*)")
+    @event("^pick_starting_regions\\s+(.+)")
     @event_item("(\\d+)")
     def on_pick_starting_regions(self, regions):
         """
         Engine giving us a list of regions to pick from.
         """
-        time = regions[0]
+        region_ids = [match.group(1) for match in regions]
+        time = region_ids[0]
 
         # Construct a list of proper region objects. Index 0 is excluded because
-        # that is the the the time we have to pick our regions.
-        temp_regions = []
-        for x in range(1, len(regions)):
-            temp_regions.append(self.regions[regions[x]])
+        # that is the the the time we have to pick our regions. The ids are
+        # converted in one batch rather than one int() call at a time.
+        temp_regions = [self.regions[region_id] for region_id in map(int, region_ids[1:])]
         self.handler.on_pick_starting_regions(self, time, temp_regions)
         self.respond()
 
@@ -430,7 +546,7 @@ class Engine(object):
         self.handler.on_go_place_armies(self, time)
         self.respond()
 
-    @event("^go\\s+attack\\/transfer\\s+(\\d+)")
+    @event("^go\\s+attack/transfer\\s+(\\d+)")
     def on_go_attack_or_transfer(self, time=0):
         """
         Engine notifying us that it is our turn to attack or transfer.